@@ -3,6 +3,10 @@ from __future__ import annotations
 
 from interfaces.com_agent_interface import ComAgent as _QueueComAgent
 
+# probed in order; "recipient" is the dominant key and usually ends the loop
+_RECIPIENT_KEYS = ("recipient", "to", "target")
+
+
 class ComAgent(_QueueComAgent):
     """
     Adapter for legacy callers expecting .communicate(dict).
@@ -14,8 +18,13 @@ class ComAgent(_QueueComAgent):
     Sends the whole payload as-is to queue-based ComAgent.send_data(recipient, payload).
     """
 
+    __slots__ = ()
+
     def communicate(self, payload: dict) -> bool:
-        recipient = payload.get("recipient") or payload.get("to") or payload.get("target")
-        if not recipient:
+        for key in _RECIPIENT_KEYS:
+            recipient = payload.get(key)
+            if recipient:
+                break
+        else:
             raise ValueError("communicate(payload) requires recipient in payload['recipient'|'to'|'target']")
-        return self.send_data(str(recipient), payload)
+        return self.send_data(recipient if type(recipient) is str else str(recipient), payload)
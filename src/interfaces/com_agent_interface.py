@@ -11,11 +11,19 @@
 Этого достаточно, чтобы интег-тест ping-pong проходил.
 """
 
+import atexit
+import contextvars
 from collections import deque
 import json
 import logging
 import base64
-from typing import Any, Deque, Tuple
+import queue
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Deque, Iterable, Tuple
 try:
     import msgpack
 except ModuleNotFoundError:  # pragma: no cover - depends on environment setup
@@ -25,9 +33,25 @@ try:
     from lam_logging import log as lam_log
 except ModuleNotFoundError:  # pragma: no cover - depends on embedding environment
     _fallback_logger = logging.getLogger(__name__)
+    _LEVEL_NOS = {
+        "trace": logging.DEBUG,
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "warn": logging.WARNING,
+        "warning": logging.WARNING,
+        "error": logging.ERROR,
+        "critical": logging.CRITICAL,
+    }
+    _LEVEL_FNS = {
+        "debug": _fallback_logger.debug,
+        "info": _fallback_logger.info,
+        "warning": _fallback_logger.warning,
+        "error": _fallback_logger.error,
+        "critical": _fallback_logger.critical,
+    }
 
     def lam_log(level: str, component: str, message: str, **fields: Any) -> None:
-        log_fn = getattr(_fallback_logger, level.lower(), _fallback_logger.info)
+        log_fn = _LEVEL_FNS.get(level) or getattr(_fallback_logger, level.lower(), _fallback_logger.info)
         if fields:
             log_fn(
                 "%s | %s | %s",
@@ -38,38 +62,228 @@ except ModuleNotFoundError:  # pragma: no cover - depends on embedding environme
             return
         log_fn("%s | %s", component, message)
 
+    def _log_enabled(level: str, *, event: "str | None" = None) -> bool:
+        return _fallback_logger.isEnabledFor(_LEVEL_NOS.get(level, logging.INFO))
+else:
+    try:
+        # решение о записи принимает сам sink: его шкала уровней и LAM_LOG_EVENTS
+        from lam_logging import should_log as _log_enabled
+    except ImportError:  # pragma: no cover - lam_logging without a level gate
+        def _log_enabled(level: str, *, event: "str | None" = None) -> bool:
+            return True
+
+
+# Канонические имена уровней: .lower() нужен только для нестандартного написания.
+_CANON_LEVELS = frozenset(("debug", "info", "warning", "error", "critical"))
+
+
+# ─────── фоновая запись логов ─────────────────────────────────────────────────
+# send_data/receive_data не должны ждать lam_log (JSON + write): записи копятся
+# пачками в агенте, пачка кладётся в очередь, а единственный фоновый поток
+# сливает её в настоящий sink. Пачка уходит по _LOG_BATCH записям или когда
+# старейшая запись ждёт дольше _LOG_FLUSH_S.
+_LOG_BATCH = 64
+_LOG_FLUSH_S = 0.25
+_log_queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+_LOG_STOP = object()
+
+# Горячие записи — кортеж значений под фиксированные имена полей: dict для
+# lam_log собирается уже в фоновом потоке. Переиспользовать один kwargs-dict
+# нельзя: запись живёт в пачке дольше, чем вызов send_data/receive_data.
+_EMPTY_CTX: dict = {}  # только для чтения: подставляется вместо отсутствующего context
+_ENQUEUE_FIELDS = ("recipient", "intent", "task_id", "trace_id", "parent_task_id", "span_id")
+_DEQUEUE_FIELDS = ("sender", "status", "task_id", "trace_id", "parent_task_id", "span_id")
+
+
+class _LogBuffer:
+    """Пачка записей одного ComAgent.
+
+    Пишет в неё поток агента, а сбрасывает ещё фоновый поток (по возрасту
+    и после сборки агента) — поэтому обмен пачки и её постановка в очередь
+    идут под замком.
+    """
+
+    __slots__ = ("records", "lock")
+
+    def __init__(self) -> None:
+        self.records: list[tuple] = []
+        self.lock = threading.Lock()
+
+    def push(self, record: tuple) -> None:
+        # info копится; всё остальное уходит сразу, вместе с накопленным,
+        # чтобы не нарушать порядок событий
+        with self.lock:
+            records = self.records
+            records.append(record)
+            if (
+                record[0] != "info"
+                or len(records) >= _LOG_BATCH
+                or record[6] - records[0][6] >= _LOG_FLUSH_S
+            ):
+                self.records = []
+                _log_queue.put_nowait(records)
+
+    def flush(self, older_than: "float | None" = None) -> None:
+        with self.lock:
+            records = self.records
+            if not records or (older_than is not None and records[0][6] > older_than):
+                return
+            self.records = []
+            _log_queue.put_nowait(records)
+
+
+_log_buffers: "set[_LogBuffer]" = set()
+_log_buffers_lock = threading.Lock()
+
+
+def _flush_log_buffers(older_than: "float | None" = None) -> None:
+    with _log_buffers_lock:
+        buffers = list(_log_buffers)
+    for buf in buffers:
+        buf.flush(older_than)
+
+
+def _release_log_buffer(buf: _LogBuffer) -> None:
+    # агент собран: финализатор только передал буфер в очередь, а из реестра
+    # его убирает и хвост пачки дописывает фоновый поток
+    with _log_buffers_lock:
+        _log_buffers.discard(buf)
+    with buf.lock:
+        records, buf.records = buf.records, []
+    if records:
+        _write_log_batch(records)
+
+
+# Сбой sink не должен останавливать слив, но и молча теряться тоже: первый
+# сбой уходит в logging.lastResort с трейсбеком, следующие — не чаще раза в
+# _SINK_ERROR_EVERY_S, со счётчиком пропущенных. Пишет сюда только фоновый поток.
+_SINK_ERROR_EVERY_S = 60.0
+_sink_error_next = float("-inf")
+_sink_errors_muted = 0
+
+
+def _report_sink_error(component: str) -> None:
+    global _sink_error_next, _sink_errors_muted
+    now = time.monotonic()
+    if now < _sink_error_next:
+        _sink_errors_muted += 1
+        return
+    _sink_error_next = now + _SINK_ERROR_EVERY_S
+    muted, _sink_errors_muted = _sink_errors_muted, 0
+    handler = logging.lastResort
+    if handler is None:
+        return
+    handler.handle(logging.makeLogRecord({
+        "name": __name__,
+        "levelno": logging.ERROR,
+        "levelname": "ERROR",
+        "msg": "lam_log failed on a %s record; %d earlier failures not reported",
+        "args": (component, muted),
+        "exc_info": sys.exc_info(),
+    }))
+
+
+def _write_log_batch(batch: list) -> None:
+    for level, component, message, names, values, created, _, context in batch:
+        fields = values if names is None else dict(zip(names, values))
+        # время и контекст — момента события, а не момента слива:
+        # lam_log берёт trace_id/task_id/... из ContextVar вызывающего
+        fields["ts"] = datetime.fromtimestamp(created, timezone.utc).isoformat()
+        try:
+            context.run(lam_log, level, component, message, **fields)
+        except Exception:
+            _report_sink_error(component)
+
+
+def _drain_log_queue() -> None:
+    next_sweep = time.monotonic() + _LOG_FLUSH_S
+    while True:
+        try:
+            batch = _log_queue.get(timeout=_LOG_FLUSH_S)
+        except queue.Empty:
+            batch = None
+        if batch is _LOG_STOP:
+            return
+        if type(batch) is _LogBuffer:
+            _release_log_buffer(batch)
+        elif batch is not None:
+            _write_log_batch(batch)
+        # агент мог замолчать с неполной пачкой: забираем то, что ждёт дольше срока
+        now = time.monotonic()
+        if now >= next_sweep:
+            _flush_log_buffers(older_than=now - _LOG_FLUSH_S)
+            next_sweep = now + _LOG_FLUSH_S
+
+
+# Поток поднимается при создании первого ComAgent, а не на импорте:
+# модулю, которому нужны только хелперы конверта, фоновый поток не нужен.
+_log_listener: "threading.Thread | None" = None
+_log_listener_lock = threading.Lock()
+
+
+def _ensure_log_listener() -> None:
+    global _log_listener
+    if _log_listener is not None:
+        return
+    with _log_listener_lock:
+        if _log_listener is None:
+            listener = threading.Thread(target=_drain_log_queue, name="comm-log-listener", daemon=True)
+            listener.start()
+            atexit.register(_stop_log_listener, listener)
+            _log_listener = listener
+
+
+def _stop_log_listener(listener: threading.Thread) -> None:
+    _flush_log_buffers()
+    _log_queue.put(_LOG_STOP)
+    listener.join(timeout=1.0)
+
+
+_REPLY_MARKERS = frozenset({
+    "status", "provider_used", "latency_ms", "attempts", "selected_chain",
+    "errors", "tokens", "usage", "reply", "result", "error", "metrics",
+})
+
 
 def _looks_like_reply(payload: dict) -> bool:
-    # не трогаем обычные task payload
-    markers = {
-        "status", "provider_used", "latency_ms", "attempts", "selected_chain",
-        "errors", "tokens", "usage", "reply", "result", "error", "metrics",
-    }
-    return any(k in payload for k in markers)
+    # не трогаем обычные task payload; isdisjoint проверяет ключи целиком на C
+    return not _REPLY_MARKERS.isdisjoint(payload)
 
 
 def _enforce_envelope(reply: dict) -> dict:
-    # Envelope Standard v1: status/context/result/error/metrics всегда есть
-    reply.setdefault("status", "ok")
+    # Envelope Standard v1: status/context/result/error/metrics всегда есть.
+    # Один проход: существующие ключи читаем один раз, дописываем только недостающие.
+    r = reply
+    get = r.get
+    r["status"] = status = get("status", "ok")
 
-    ctx = reply.get("context")
-    if not isinstance(ctx, dict):
-        ctx = {}
-    reply["context"] = ctx
+    ctx = get("context")
+    r["context"] = ctx if type(ctx) is dict else {}
 
-    if "result" not in reply:
-        if "reply" in reply:
-            reply["result"] = {"reply": reply.get("reply")}
-        else:
-            reply["result"] = reply.get("result")
-    
-    reply.setdefault("error", None)
-    reply.setdefault("metrics", {})
+    if "result" not in r:
+        r["result"] = {"reply": r["reply"]} if "reply" in r else None
+    if "error" not in r:
+        r["error"] = None
+    if "metrics" not in r:
+        r["metrics"] = {}
 
-    if reply.get("status") != "ok" and reply.get("error") is None:
-        reply["error"] = {"message": "unknown error"}
+    if status != "ok" and r["error"] is None:
+        r["error"] = {"message": "unknown error"}
 
-    return reply
+    return r
+
+
+def _is_conforming_reply(data: dict) -> bool:
+    # дешёвая положительная проверка: ответ сервера уже по стандарту,
+    # и _enforce_envelope ничего бы в нём не поменял
+    return (
+        "status" in data
+        and "result" in data
+        and "metrics" in data
+        and "error" in data
+        and type(data.get("context")) is dict
+        and (data["status"] == "ok" or data["error"] is not None)
+    )
 
 
 def _encode_msgpack_payload(payload: dict) -> str:
@@ -100,39 +314,52 @@ def _build_transport_envelope(payload: dict) -> dict:
     }
 
 
-def _normalize_transport_envelope(data: dict) -> dict:
-    if not isinstance(data, dict):
-        return data
-    msg_type = data.get("msg_type")
-    payload_b64 = data.get("msgpack_payload")
-    if not isinstance(msg_type, str) or not isinstance(payload_b64, str):
-        return data
+def _unpack_transport_envelope(msg_type: str, payload_b64: str, credit_delta: int) -> dict:
+    # поля собраны _build_transport_envelope, проверять их форму не нужно
     unpacked = _decode_msgpack_payload(payload_b64)
-    unpacked["_transport"] = {"msg_type": msg_type}
-    if isinstance(data.get("credit_delta"), int):
-        unpacked["_transport"]["credit_delta"] = data.get("credit_delta")
+    unpacked["_transport"] = {"msg_type": msg_type, "credit_delta": credit_delta}
     return unpacked
 
 
 class ComAgent:
     """Очередь сообщений между LAM-агентами."""
 
+    # __weakref__ нужен для weakref.finalize (сброс логов собранного агента)
+    __slots__ = ("_registry", "_registry_keys", "_queue", "_credits", "_log_buf", "__weakref__")
+
     def __init__(self) -> None:
         self._registry: dict[str, Any] = {}
+        # тень ключей реестра: send_data проверяет адресата, не трогая значения
+        self._registry_keys: set[str] = set()
         self._queue: Deque[Tuple[str, dict]] = deque()
         self._credits: dict[str, int] = {}
+        self._log_buf = buf = _LogBuffer()
+        _ensure_log_listener()
+        with _log_buffers_lock:
+            _log_buffers.add(buf)
+        # GC может собрать агента в любом аллоцирующем месте, в том числе под
+        # _log_buffers_lock или замком буфера: финализатор замков не берёт,
+        # а только кладёт буфер в реентерабельную SimpleQueue
+        weakref.finalize(self, _log_queue.put_nowait, buf)
 
     # ─────── реестр ────────────────────────────────────────────────────────────
     def register_agent(self, name: str, obj: Any) -> None:
+        # имена агентов — маленький закрытый набор: интернируем ключ реестра,
+        # чтобы поиск по литералам/интернированным строкам шёл по идентичности
+        name = sys.intern(name) if type(name) is str else name
         self._registry[name] = obj
+        self._registry_keys.add(name)
         self._credits.setdefault(name, 0)
         # низкий шум: не comm.enqueue/comm.dequeue, а отдельное событие
-        lam_log("debug", "comm.registry", "register", action="register", agent=name)
+        if _log_enabled("debug", event="comm.registry"):
+            self._emit("debug", "comm.registry", "register", action="register", agent=name)
 
     def unregister_agent(self, name: str) -> None:
         self._registry.pop(name, None)
+        self._registry_keys.discard(name)
         self._credits.pop(name, None)
-        lam_log("debug", "comm.registry", "unregister", action="unregister", agent=name)
+        if _log_enabled("debug", event="comm.registry"):
+            self._emit("debug", "comm.registry", "unregister", action="unregister", agent=name)
 
     def list_agents(self) -> list[str]:
         return list(self._registry)
@@ -144,80 +371,122 @@ class ComAgent:
         Тесты сами вызывают `agent.answer`, поэтому здесь
         **не** преобразуем payload.
         """
-        if recipient not in self._registry:
-            lam_log("error", "comm.enqueue", "unknown recipient", recipient=recipient, error="unknown_recipient")
+        if recipient not in self._registry_keys:
+            self._emit("error", "comm.enqueue", "unknown recipient", recipient=recipient, error="unknown_recipient")
             return False
 
         if self._credits.get(recipient, 0) <= 0:
-            lam_log("warning", "comm.backpressure", "credit_exhausted", recipient=recipient)
+            self._emit("warning", "comm.backpressure", "credit_exhausted", recipient=recipient)
             return False
 
-        envelope = _build_transport_envelope(payload if isinstance(payload, dict) else {})
+        envelope = _build_transport_envelope(payload)
         self._queue.append((recipient, envelope))
         self._credits[recipient] = self._credits.get(recipient, 0) - 1
 
-        ctx = payload.get("context") if isinstance(payload, dict) else None
-        if not isinstance(ctx, dict):
-            ctx = {}
+        if _log_enabled("info", event="comm.enqueue"):
+            self._log_enqueue(recipient, payload)
+        return True
+
+    def send_many(self, messages: Iterable[Tuple[str, dict]]) -> list[bool]:
+        """Кладёт пачку (адресат, payload) в очередь; по каждому — результат send_data."""
+        send = self.send_data
+        return [send(recipient, payload) for recipient, payload in messages]
+
+    def _log_enqueue(self, recipient: str, payload: dict) -> None:
+        ctx = payload.get("context")
+        if type(ctx) is not dict:
+            ctx = _EMPTY_CTX
 
-        lam_log(
+        self._push(
             "info",
             "comm.enqueue",
             "enqueue",
-            recipient=recipient,
-            intent=payload.get("intent") if isinstance(payload, dict) else None,
-            task_id=ctx.get("task_id"),
-            trace_id=ctx.get("trace_id"),
-            parent_task_id=ctx.get("parent_task_id"),
-            span_id=ctx.get("span_id"),
+            _ENQUEUE_FIELDS,
+            (
+                recipient,
+                payload.get("intent"),
+                ctx.get("task_id"),
+                ctx.get("trace_id"),
+                ctx.get("parent_task_id"),
+                ctx.get("span_id"),
+            ),
         )
-        return True
 
     def receive_data(self) -> Tuple[str, dict]:
         """Достаёт следующее сообщение (или возвращает "", {})."""
         if self._queue:
             sender, data = self._queue.popleft()
 
-            status = data.get("status") if isinstance(data, dict) else None
-            ctx = data.get("context") if isinstance(data, dict) else None
-            if not isinstance(ctx, dict):
-                ctx = {}
-
-            lam_log(
-                "info",
-                "comm.dequeue",
-                "dequeue",
-                sender=sender,
-                status=status,
-                task_id=ctx.get("task_id"),
-                trace_id=ctx.get("trace_id"),
-                parent_task_id=ctx.get("parent_task_id"),
-                span_id=ctx.get("span_id"),
-            )
-
-            if isinstance(data, dict):
-                data = _normalize_transport_envelope(data)
-                if _looks_like_reply(data):
-                    data = _enforce_envelope(data)
+            # в очереди лежат только конверты, собранные _build_transport_envelope
+            data = _unpack_transport_envelope(data["msg_type"], data["msgpack_payload"], data["credit_delta"])
+
+            # запись строим по распакованному payload: в транспортном
+            # конверте нет ни status, ни context
+            if _log_enabled("info", event="comm.dequeue"):
+                status = data.get("status")
+                ctx = data.get("context")
+                if type(ctx) is not dict:
+                    ctx = _EMPTY_CTX
+
+                self._push(
+                    "info",
+                    "comm.dequeue",
+                    "dequeue",
+                    _DEQUEUE_FIELDS,
+                    (
+                        sender,
+                        status,
+                        ctx.get("task_id"),
+                        ctx.get("trace_id"),
+                        ctx.get("parent_task_id"),
+                        ctx.get("span_id"),
+                    ),
+                )
+
+            if not _is_conforming_reply(data) and _looks_like_reply(data):
+                data = _enforce_envelope(data)
             return sender, data
 
-        # шум минимальный: empty не логируем (часто в тестах)
+        # шум минимальный: empty не логируем (часто в тестах);
+        # пустая очередь — момент простоя, сбрасываем накопленные записи
+        self.flush_logs()
         return "", {}
 
     # ─────── утилита ───────────────────────────────────────────────────────────
+    def flush_logs(self) -> None:
+        """Отдаёт накопленные записи фоновому потоку одной пачкой."""
+        self._log_buf.flush()
+
+    def _emit(self, level: str, component: str, message: str, **fields: Any) -> None:
+        self._push(level, component, message, None, fields)
+
+    def _push(self, level: str, component: str, message: str, names: "tuple | None", values: Any) -> None:
+        # time.time() идёт в ts записи, а возраст пачки меряется по monotonic:
+        # перевод системных часов не должен задерживать или торопить сброс
+        self._log_buf.push(
+            (level, component, message, names, values, time.time(), time.monotonic(), contextvars.copy_context())
+        )
+
     def log_communication(self, msg: str, level: str = "info") -> None:
         # Legacy API: пусть пишет через lam_logging
-        lam_log(level.lower(), "comm.legacy", msg, message=msg)
+        level = level if level in _CANON_LEVELS else level.lower()
+        if _log_enabled(level, event="comm.legacy"):
+            self._emit(level, "comm.legacy", msg, message=msg)
 
     # ─────── credit / backpressure ────────────────────────────────────────────
     def set_credit(self, agent: str, credits: int) -> None:
         self._credits[agent] = max(0, int(credits))
-        lam_log("info", "comm.credit", "set", agent=agent, credits=self._credits[agent])
+        if _log_enabled("info", event="comm.credit"):
+            self._emit("info", "comm.credit", "set", agent=agent, credits=self._credits[agent])
 
     def add_credit(self, agent: str, delta: int = 1) -> int:
         self._credits[agent] = max(0, self._credits.get(agent, 0) + int(delta))
-        lam_log("info", "comm.credit", "add", agent=agent, credits=self._credits[agent], delta=int(delta))
+        if _log_enabled("info", event="comm.credit"):
+            self._emit("info", "comm.credit", "add", agent=agent, credits=self._credits[agent], delta=int(delta))
         return self._credits[agent]
 
     def get_credit(self, agent: str) -> int:
         return self._credits.get(agent, 0)
+
+
+__all__ = ["ComAgent"]
@@ -0,0 +1,173 @@
+# Copyright (c) 2026-06-07 RADRILONIUMA / TRIANIUMA Kingdom. All rights reserved.
+import contextvars
+import gc
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import interfaces.com_agent_interface as comm
+from interfaces.com_agent_interface import ComAgent
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(comm, "_fallback_logger"), reason="gate follows the stdlib fallback logger"
+)
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    records: list[tuple] = []
+
+    def stub(level, component, message, **fields):
+        records.append((level, component, message, fields))
+
+    monkeypatch.setattr(comm, "lam_log", stub)
+    return records
+
+
+@pytest.fixture
+def fallback_level():
+    logger = comm._fallback_logger
+    saved = logger.level
+
+    def set_level(level: int) -> None:
+        logger.setLevel(level)
+
+    yield set_level
+    logger.setLevel(saved)
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_gate_follows_fallback_logger_level(sink, fallback_level) -> None:
+    fallback_level(logging.DEBUG)
+    c = ComAgent()
+    c.register_agent("worker", object())
+    assert wait_for(lambda: any(r[1] == "comm.registry" for r in sink))
+
+    fallback_level(logging.WARNING)
+    c.set_credit("worker", 1)
+    assert c.send_data("worker", {"intent": "ping"})
+    c.receive_data()
+    c.receive_data()
+    assert c.send_data("missing", {"intent": "ping"}) is False
+    assert wait_for(lambda: any(r[1] == "comm.enqueue" and r[0] == "error" for r in sink))
+    assert not any(r[0] == "info" for r in sink)
+
+
+def test_records_keep_event_time_and_caller_context(fallback_level, monkeypatch) -> None:
+    trace = contextvars.ContextVar("trace", default=None)
+    seen: list[tuple] = []
+
+    def stub(level, component, message, **fields):
+        seen.append((component, fields["ts"], trace.get()))
+
+    monkeypatch.setattr(comm, "lam_log", stub)
+    fallback_level(logging.INFO)
+
+    c = ComAgent()
+    c.register_agent("worker", object())
+    c.set_credit("worker", 1)
+    token = trace.set("t-42")
+    sent_at = datetime.now(timezone.utc)
+    assert c.send_data("worker", {"intent": "ping"})
+    trace.reset(token)
+
+    time.sleep(0.1)
+    flushed_at = datetime.now(timezone.utc)
+    c.flush_logs()
+
+    assert wait_for(lambda: any(r[0] == "comm.enqueue" for r in seen))
+    _, ts, ctx_trace = next(r for r in seen if r[0] == "comm.enqueue")
+    assert sent_at <= datetime.fromisoformat(ts) < flushed_at
+    assert ctx_trace == "t-42"
+
+
+def _produce(c: ComAgent) -> None:
+    c.register_agent("worker", object())
+    c.set_credit("worker", 3)
+    for _ in range(3):
+        assert c.send_data("worker", {"intent": "ping"})
+
+
+def test_idle_producer_records_are_flushed_by_age(sink, fallback_level) -> None:
+    fallback_level(logging.INFO)
+    c = ComAgent()
+    _produce(c)
+
+    # ни receive_data, ни flush_logs: пачку забирает фоновый поток по сроку
+    assert wait_for(lambda: sum(r[0] == "info" for r in sink) == 4)
+    assert c.get_credit("worker") == 0
+
+
+def test_collected_agent_records_are_flushed(sink, fallback_level) -> None:
+    fallback_level(logging.INFO)
+    c = ComAgent()
+    _produce(c)
+    del c
+    gc.collect()
+
+    assert wait_for(lambda: sum(r[0] == "info" for r in sink) == 4, timeout=0.2)
+
+
+class _Worker:
+    def __init__(self) -> None:
+        # worker → bus → реестр → worker: такой агент собирает только gc
+        self.bus = ComAgent()
+        self.bus.register_agent("worker", self)
+
+
+def test_agent_collected_under_registry_lock_does_not_deadlock(sink, fallback_level) -> None:
+    fallback_level(logging.INFO)
+    worker = _Worker()
+    worker.bus.set_credit("worker", 3)
+    for _ in range(3):
+        assert worker.bus.send_data("worker", {"intent": "ping"})
+    del worker
+
+    def collect_under_lock() -> None:
+        # финализатор срабатывает в том потоке, где GC прервал код под замком
+        with comm._log_buffers_lock:
+            gc.collect()
+
+    collector = threading.Thread(target=collect_under_lock, daemon=True)
+    collector.start()
+    collector.join(timeout=2.0)
+
+    assert not collector.is_alive()
+    assert wait_for(lambda: sum(r[0] == "info" for r in sink) == 4)
+    ComAgent()
+
+
+def test_sink_failures_are_reported_once_per_interval(fallback_level, monkeypatch) -> None:
+    reported: list[logging.LogRecord] = []
+
+    class Recorder(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            reported.append(record)
+
+    def broken(level, component, message, **fields):
+        raise RuntimeError("sink is down")
+
+    monkeypatch.setattr(comm, "lam_log", broken)
+    monkeypatch.setattr(logging, "lastResort", Recorder())
+    monkeypatch.setattr(comm, "_sink_error_next", float("-inf"))
+    monkeypatch.setattr(comm, "_sink_errors_muted", 0)
+    fallback_level(logging.INFO)
+
+    c = ComAgent()
+    _produce(c)
+    c.flush_logs()
+
+    assert wait_for(lambda: comm._sink_errors_muted == 3)
+    assert len(reported) == 1
+    assert reported[0].exc_info[0] is RuntimeError
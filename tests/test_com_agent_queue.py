@@ -0,0 +1,20 @@
+# Copyright (c) 2026-06-07 RADRILONIUMA / TRIANIUMA Kingdom. All rights reserved.
+from interfaces.com_agent_interface import ComAgent
+
+
+def test_com_agent_send_many_matches_send_data_per_message() -> None:
+    c = ComAgent()
+    c.register_agent("worker", object())
+    c.set_credit("worker", 2)
+
+    results = c.send_many([
+        ("worker", {"intent": "ping", "seq": 0}),
+        ("missing", {"intent": "ping"}),
+        ("worker", {"intent": "ping", "seq": 1}),
+        ("worker", {"intent": "ping", "seq": 2}),
+    ])
+
+    assert results == [True, False, True, False]
+    assert c.get_credit("worker") == 0
+    assert [c.receive_data()[1]["seq"] for _ in range(2)] == [0, 1]
+    assert c.receive_data() == ("", {})
@@ -27,3 +27,22 @@ def test_credit_backpressure_blocks_when_zero_and_allows_after_refill() -> None:
     c.add_credit("worker", 1)
     assert c.get_credit("worker") == 1
     assert c.send_data("worker", {"intent": "ping"}) is True
+
+
+def test_reply_envelope_fills_missing_fields() -> None:
+    c = ComAgent()
+    c.register_agent("worker", object())
+    c.set_credit("worker", 2)
+
+    assert c.send_data("worker", {"reply": "pong", "context": "bad"})
+    _, ok = c.receive_data()
+    assert ok["status"] == "ok"
+    assert ok["context"] == {}
+    assert ok["result"] == {"reply": "pong"}
+    assert ok["error"] is None
+    assert ok["metrics"] == {}
+
+    assert c.send_data("worker", {"status": "fail"})
+    _, failed = c.receive_data()
+    assert failed["result"] is None
+    assert failed["error"] == {"message": "unknown error"}